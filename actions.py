@@ -16,6 +16,8 @@ Notes:
 """
 
 import logging
+from functools import partial
+from typing import Callable
 
 try:
     import keyboard  # better global media key support on Windows
@@ -23,7 +25,25 @@ except Exception:
     keyboard = None
 
 try:
-    import pyautogui  # robust hotkeys (Ctrl+Right/Left) & volume keys
+    # Hotkeys (Ctrl+Right/Left) & volume keys; unlike pyautogui there is no
+    # implicit pause after each call
+    from pynput.keyboard import Controller as _Controller, Key
+    _kb = _Controller()
+    _PYNPUT_KEYS = {
+        "ctrl": Key.ctrl,
+        "left": Key.left,
+        "right": Key.right,
+        "space": Key.space,
+        "volumeup": Key.media_volume_up,
+        "volumedown": Key.media_volume_down,
+        "playpause": Key.media_play_pause,
+    }
+except Exception:
+    _kb = None
+
+try:
+    import pyautogui  # last-resort fallback for hotkeys & volume keys
+    pyautogui.PAUSE = 0  # default sleeps 100 ms after every call
 except Exception:
     pyautogui = None
 
@@ -32,7 +52,13 @@ logging.basicConfig(level=logging.INFO)
 
 
 def _safe_hotkey(*keys) -> bool:
+    # keys use pyautogui names, e.g. ("ctrl", "right"); the last one is tapped
     try:
+        if _kb:
+            *mods, key = (_PYNPUT_KEYS[k] for k in keys)
+            with _kb.pressed(*mods):
+                _kb.tap(key)
+            return True
         if pyautogui:
             pyautogui.hotkey(*keys)
             return True
@@ -43,6 +69,9 @@ def _safe_hotkey(*keys) -> bool:
 
 def _safe_press(key: str) -> bool:
     try:
+        if _kb:
+            _kb.tap(_PYNPUT_KEYS[key])
+            return True
         if pyautogui:
             pyautogui.press(key)
             return True
@@ -51,16 +80,36 @@ def _safe_press(key: str) -> bool:
     return False
 
 
+def warm_up() -> None:
+    """
+    Touch the input backends once at startup so their lazy initialisation
+    (X11/Win32 bindings, key maps) doesn't delay the first real action.
+    """
+    # Separate guards: keyboard raises on Linux without root, which must not
+    # skip the pyautogui warm-up
+    if keyboard:
+        try:
+            keyboard.is_pressed("shift")
+        except Exception as e:
+            logger.warning("keyboard warm-up failed: %s", e)
+    if pyautogui:
+        try:
+            pyautogui.position()
+        except Exception as e:
+            logger.warning("pyautogui warm-up failed: %s", e)
+
+
 def _send_media(action: str) -> bool:
     """
     Helper for media actions:
       action in {"play","pause", "next", "previous", "volume_up", "volume_down"}
     """
+    kb = keyboard  # one global lookup per call
     # Prefer keyboard's system media keys when present
-    if keyboard:
+    if kb:
         try:
             if action in ("play", "pause"):
-                keyboard.send("play/pause media")
+                kb.send("play/pause media")
                 return True
             elif action == "next":
                 # Use only Ctrl+Right for next track
@@ -69,15 +118,15 @@ def _send_media(action: str) -> bool:
                 # Use only Ctrl+Left for previous track
                 return _safe_hotkey("ctrl", "left")
             elif action == "volume_up":
-                keyboard.send("volume up")
+                kb.send("volume up")
                 return True
             elif action == "volume_down":
-                keyboard.send("volume down")
+                kb.send("volume down")
                 return True
         except Exception as e:
             logger.exception("keyboard media send failed: %s", e)
 
-    # Fallbacks with pyautogui
+    # Fallbacks with pynput (or pyautogui)
     if action == "next":
         return _safe_hotkey("ctrl", "right")
     if action == "previous":
@@ -92,35 +141,23 @@ def _send_media(action: str) -> bool:
     return False
 
 
+# Gesture name -> handler; each handler returns True if an action was sent
+_DISPATCH: dict[str, Callable[[], bool]] = {
+    name: partial(_send_media, name)
+    for name in ("volume_up", "volume_down", "next", "previous", "play", "pause")
+}
+
+
 def perform_action(gesture: str) -> bool:
     """
     Receives a gesture string and performs the mapped action.
     Accepts: "play", "pause", "next", "previous", "volume_up", "volume_down"
     """
     g = (gesture or "").lower()
-    if g == "volume_up":
-        logger.info("Action: volume up")
-        return _send_media("volume_up")
-
-    if g == "volume_down":
-        logger.info("Action: volume down")
-        return _send_media("volume_down")
+    fn = _DISPATCH.get(g)
+    if fn is None:
+        logger.debug("Unknown gesture: %s", gesture)
+        return False
 
-    if g == "next":
-        logger.info("Action: next track")
-        return _send_media("next")
-
-    if g == "previous":
-        logger.info("Action: previous track")
-        return _send_media("previous")
-
-    if g == "play":
-        logger.info("Action: play")
-        return _send_media("play")
-
-    if g == "pause":
-        logger.info("Action: pause")
-        return _send_media("pause")
-
-    logger.debug("Unknown gesture: %s", gesture)
-    return False
+    logger.info("Action: %s", g)
+    return fn()
@@ -7,149 +7,180 @@ Returns one of:
 
 import math
 import os
+from dataclasses import dataclass, field
+
+import numpy as np
+
+try:
+    from numba import njit  # compiles the per-frame classifier to machine code
+except ImportError:
+    def njit(*args, **kwargs):
+        # numba not installed: run the same functions as plain Python
+        return lambda fn: fn
 
 # MediaPipe landmark indices
 # Thumb: 1(CMC), 2(MCP), 3(IP), 4(TIP)
 # Index/Middle/Ring/Pinky: MCP -> PIP -> DIP -> TIP
-TIPS = [4, 8, 12, 16, 20]          # thumb, index, middle, ring, pinky tips
-PIPS = [3, 6, 10, 14, 18]          # corresponding lower joints
+TIPS = np.array([4, 8, 12, 16, 20])    # thumb, index, middle, ring, pinky tips
+PIPS = np.array([3, 6, 10, 14, 18])    # corresponding lower joints
 
 # Small tolerance to reduce jitter
 MARGIN_Y = 0.02    # for up/down comparisons
 MARGIN_X = 0.02    # not used much here but handy if needed
 
-
-def _finger_is_up(landmarks, tip_idx, pip_idx) -> bool:
-    #For non-thumb fingers: finger is 'up' if tip is ABOVE pip (smaller y).
-    tip = landmarks.landmark[tip_idx]
-    pip = landmarks.landmark[pip_idx]
-    return (tip.y + MARGIN_Y) < pip.y
-
-
-def _thumb_extended_up(landmarks) -> bool:
-    
-    # Thumb 'up' if:
-    #   1) Thumb is extended (tip far enough from IP),
-    #   2) Thumb tip is ABOVE thumb IP (smaller y).
-    
-    tip = landmarks.landmark[4]
-    ip  = landmarks.landmark[3]
-    # distance threshold for "extended"
-    dist = math.hypot(tip.x - ip.x, tip.y - ip.y)
-    extended = dist > 0.05
-    oriented_up = (tip.y + MARGIN_Y) < ip.y
-    return extended and oriented_up
-
-
-def _thumb_extended_down(landmarks) -> bool:
-    #Thumb 'down' if extended and tip is BELOW IP (larger y).
-    tip = landmarks.landmark[4]
-    ip  = landmarks.landmark[3]
-    dist = math.hypot(tip.x - ip.x, tip.y - ip.y)
-    extended = dist > 0.05
-    oriented_down = (tip.y - MARGIN_Y) > ip.y
-    return extended and oriented_down
-
-
-def _all_non_thumb_up(landmarks) -> bool:
-    # rest of the fingers are 'up' if tips are ABOVE their PIPs (smaller y).
-    return all(_finger_is_up(landmarks, TIPS[i], PIPS[i]) for i in range(1, 5))
-
-
-def _all_non_thumb_down(landmarks) -> bool:
-    # rest of the fingers are 'down' if tips are BELOW their PIPs (larger y).
-    return not any(_finger_is_up(landmarks, TIPS[i], PIPS[i]) for i in range(1, 5))
-
-
-def detect_gesture(hand_landmarks, hand_history, frame_shape, config) -> str:
-    # Anti-clockwise rotation detection for volume down
-    def get_hand_angle(landmarks):
-        wrist = landmarks.landmark[0]
-        index_tip = landmarks.landmark[8]
-        dx = index_tip.x - wrist.x
-        dy = index_tip.y - wrist.y
-        angle = math.degrees(math.atan2(dy, dx))
-        return angle
-
-    # Use correct attribute name for maxlen (HandHistory likely uses 'max_length')
-    maxlen = getattr(hand_history, 'maxlen', getattr(hand_history, 'max_length', 8))
-    if hasattr(hand_history, 'angle_history'):
-        hand_history.angle_history.append(get_hand_angle(hand_landmarks))
-        if len(hand_history.angle_history) > maxlen:
-            hand_history.angle_history.popleft()
-    else:
-        from collections import deque
-        hand_history.angle_history = deque([get_hand_angle(hand_landmarks)], maxlen=maxlen)
-
-    angles = list(getattr(hand_history, 'angle_history', []))
-    if len(angles) >= 3:
-        d_angle = angles[-1] - angles[0]
-        rot_thresh = float(config.get("rotation_angle_threshold", -20))  # negative for anti-clockwise
-        if d_angle < rot_thresh:
-            return "volume_down"
+# Thumb tip must be at least this far from the IP joint to count as extended
+THUMB_EXTENDED_DIST = 0.05
+THUMB_EXTENDED_SQ = THUMB_EXTENDED_DIST ** 2   # distances are compared squared
+
+
+@dataclass(frozen=True)
+class GestureConfig:
+    # Thresholds read from config.json once at startup instead of on every frame
+    swipe_thresh: float = 0.02    # normalized palm-x travel across the history
+    rot_angle: float = -20.0      # degrees; negative for anti-clockwise
+    rot_y: float = 0.07           # normalized palm-y rise across the history
+    pinch_thresh: float = 0.03    # normalized thumb-index tip distance
+    pinch_sq: float = field(init=False, repr=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "pinch_sq", self.pinch_thresh ** 2)
+
+    @classmethod
+    def from_dict(cls, config):
+        return cls(
+            swipe_thresh=float(config.get("swipe_norm_threshold", cls.swipe_thresh)),
+            rot_angle=float(config.get("rotation_angle_threshold", cls.rot_angle)),
+            rot_y=float(config.get("rotation_y_threshold", cls.rot_y)),
+            pinch_thresh=float(config.get("pinch_threshold", cls.pinch_thresh)),
+        )
+
+
+def landmarks_to_np(hand_landmarks) -> np.ndarray:
+    # Pull all 21 landmarks (one hand of a HandLandmarkerResult) out of MediaPipe
+    # once per frame as a (21, 3) array of x, y, z.
+    return np.fromiter(
+        (v for lm in hand_landmarks for v in (lm.x, lm.y, lm.z)),
+        dtype=np.float32,
+        count=63,
+    ).reshape(21, 3)
+
+
+# Gesture labels; the compiled classifier returns an index into this tuple
+GESTURES = ("none", "next", "previous", "volume_down", "volume_up", "play", "pause", "quit")
+_NONE, _NEXT, _PREVIOUS, _VOLUME_DOWN, _VOLUME_UP, _PLAY, _PAUSE, _QUIT = range(len(GESTURES))
+
+
+@njit(cache=True)
+def _span(w):
+    # (number of non-NaN samples, oldest non-NaN, newest non-NaN) of a history window
+    n = 0
+    first = np.nan
+    last = np.nan
+    for v in w:
+        if not np.isnan(v):
+            if n == 0:
+                first = v
+            last = v
+            n += 1
+    return n, first, last
+
+
+@njit(cache=True)
+def _hand_angle(lm):
+    # Angle of the wrist -> index tip vector, in degrees
+    return math.degrees(math.atan2(lm[8, 1] - lm[0, 1], lm[8, 0] - lm[0, 0]))
+
+
+@njit(cache=True)
+def _classify(lm, xs, ys, angles, inv_frame_w, swipe_thresh, rot_angle, rot_y, pinch_sq):
+    # Pure-numeric classifier; lm is (21, 3), xs/ys/angles are oldest->newest
+    # history windows with NaN for missing samples. Returns an index into GESTURES.
+
+    # Swipe beats pose, so check it first and skip the rest on swipe frames
+    # (increases sensitivity)
+    n, first, last = _span(xs)
+    if n >= 3:
+        norm_dx = (last - first) * inv_frame_w  # normalize
+        if norm_dx > swipe_thresh:
+            return _NEXT
+        elif norm_dx < -swipe_thresh:
+            return _PREVIOUS
+
+    # Anti-clockwise rotation -> volume down
+    n, first, last = _span(angles)
+    if n >= 3 and last - first < rot_angle:
+        return _VOLUME_DOWN
 
     # Pinch gesture: index tip and thumb tip close together -> quit
-    thumb_tip = hand_landmarks.landmark[4]
-    index_tip = hand_landmarks.landmark[8]
-    pinch_dist = math.hypot(thumb_tip.x - index_tip.x, thumb_tip.y - index_tip.y)
-    pinch_thresh = float(config.get("pinch_threshold", 0.03))
-    if pinch_dist < pinch_thresh:
-        return "quit"
-    
-    # Mapping:
-    #   Thumbs up   -> volume_up
-    #   Thumbs down -> volume_down
-    #   Palm        -> play
-    #   Fist        -> pause
-    #   Swipe left  -> previous
-    #   Swipe right -> next
-    
-
-    # Swipe detection (increases sensitivity)
-    xs = [x for x in hand_history.history if x is not None]
-    if len(xs) >= 3:
-        dx = xs[-1] - xs[0]
-        frame_w = frame_shape[1]
-        norm_dx = dx / max(1, frame_w) # normalize
-        swipe_threshold = float(config.get("swipe_norm_threshold", 0.02))
-        if norm_dx > swipe_threshold:
-            return "next"
-        elif norm_dx < -swipe_threshold:
-            return "previous"
+    dx = lm[4, 0] - lm[8, 0]
+    dy = lm[4, 1] - lm[8, 1]
+    if dx * dx + dy * dy < pinch_sq:
+        return _QUIT
 
     # Volume down: anti-clockwise hand rotation (detect by palm center y decreasing over time)
-    palm_ys = [None if x is None else hand_landmarks.landmark[9].y for x in hand_history.history]
-    palm_ys = [y for y in palm_ys if y is not None]
-    if len(palm_ys) >= 3:
-        dy = palm_ys[-1] - palm_ys[0]
-        rot_thresh = float(config.get("rotation_y_threshold", 0.07))
-        if dy < -rot_thresh:
-            return "volume_down"
-
-    # Static pose detection
-    non_thumb_up = _all_non_thumb_up(hand_landmarks)
-    non_thumb_down = _all_non_thumb_down(hand_landmarks)
-
-    thumb_up_pose = _thumb_extended_up(hand_landmarks)
-    thumb_down_pose = _thumb_extended_down(hand_landmarks)
+    n, first, last = _span(ys)
+    if n >= 3 and last - first < -rot_y:
+        return _VOLUME_DOWN
+
+    # Static pose detection. A finger is 'up' if its tip is ABOVE its PIP (smaller y).
+    non_thumb_up = True
+    non_thumb_down = True
+    for i in range(1, 5):
+        up = (lm[TIPS[i], 1] + MARGIN_Y) < lm[PIPS[i], 1]
+        non_thumb_up = non_thumb_up and up
+        non_thumb_down = non_thumb_down and not up
+
+    # Thumb is extended if the tip is far enough from the IP joint;
+    # 'up' if the tip is ABOVE the IP (smaller y), 'down' if BELOW.
+    dx = lm[4, 0] - lm[3, 0]
+    dy = lm[4, 1] - lm[3, 1]
+    thumb_extended = dx * dx + dy * dy > THUMB_EXTENDED_SQ
+    thumb_up_pose = thumb_extended and (lm[4, 1] + MARGIN_Y) < lm[3, 1]
+    thumb_down_pose = thumb_extended and (lm[4, 1] - MARGIN_Y) > lm[3, 1]
 
     # Palm: all fingers up
     if thumb_up_pose and non_thumb_up:
-        return "play"
+        return _PLAY
 
     # Fist: all non-thumb fingers down, thumb folded across or resting on top
-    thumb_tip = hand_landmarks.landmark[4]
-    thumb_ip = hand_landmarks.landmark[3]
-    thumb_mcp = hand_landmarks.landmark[2]
-    thumb_folded = (abs(thumb_tip.x - thumb_mcp.x) < 0.07) and (abs(thumb_tip.y - thumb_mcp.y) < 0.07)
+    thumb_folded = abs(lm[4, 0] - lm[2, 0]) < 0.07 and abs(lm[4, 1] - lm[2, 1]) < 0.07
     if non_thumb_down and thumb_folded:
-        return "pause"
+        return _PAUSE
 
     # Thumbs up/down with other fingers closed
     if thumb_up_pose and non_thumb_down:
-        return "volume_up"
+        return _VOLUME_UP
     # More tolerant thumbs down: thumb extended down, other fingers down
     if thumb_down_pose and non_thumb_down:
-        return "volume_down"
+        return _VOLUME_DOWN
+
+    return _NONE
+
+
+def detect_gesture(lm, hand_history, inv_frame_w, cfg) -> str:
+    # lm: (21, 3) array from landmarks_to_np; inv_frame_w: 1 / frame width in pixels;
+    # cfg: GestureConfig
+
+    # Mapping:
+    #   Thumbs up   -> volume_up
+    #   Thumbs down -> volume_down
+    #   Palm        -> play
+    #   Fist        -> pause
+    #   Swipe left  -> previous
+    #   Swipe right -> next
 
-    return "none"
+    # Anti-clockwise rotation detection for volume down. Recorded every frame
+    # (before any early return) so the angle timeline has no gaps.
+    hand_history.angles.append(_hand_angle(lm))
+
+    return GESTURES[_classify(
+        lm,
+        hand_history.xs.window(),
+        hand_history.ys.window(),
+        hand_history.angles.window(),
+        inv_frame_w,
+        cfg.swipe_thresh,
+        cfg.rot_angle,
+        cfg.rot_y,
+        cfg.pinch_sq,
+    )]
@@ -1,23 +1,41 @@
 """
 Main entrypoint for the Gesture Media Controller.
 
-- Captures webcam frames with OpenCV
-- Uses MediaPipe Hands to extract landmarks
+- Captures webcam frames with OpenCV on a capture thread
+- Feeds them to MediaPipe's HandLandmarker (live-stream mode) on an inference thread
 - Uses gestures.detect_gesture to classify gestures
 - Uses actions.perform_action to send media keys
-- Uses utils.ActionCooldown to avoid repeated triggers
+- Uses utils.GestureDebouncer (with an ActionCooldown) to fire once per gesture
+- Shows the newest annotated frame from the main thread
 """
 
+import sys
 import time
 import json
+import threading
 from collections import deque
 
 import cv2
 import mediapipe as mp
+import numpy as np
+from mediapipe.tasks import python as mp_python
+from mediapipe.tasks.python import vision
 
-from gestures import detect_gesture
-from actions import perform_action
-from utils import ActionCooldown, HandHistory
+from gestures import GestureConfig, detect_gesture, landmarks_to_np
+from actions import perform_action, warm_up
+from utils import ActionCooldown, GestureDebouncer, HandHistory, LatestValue, ensure_model
+
+try:
+    import keyboard  # Esc-to-quit when running without a preview window
+except Exception:
+    keyboard = None
+
+# The per-frame OpenCV work (flip, cvtColor, small resizes) is too small to benefit
+# from a thread pool or OpenCL; keep it single-threaded so it doesn't contend with
+# MediaPipe's own threads, and skip the OpenCL probe that stalls the first frames.
+cv2.setUseOptimized(True)
+cv2.setNumThreads(1)
+cv2.ocl.setUseOpenCL(False)
 
 # Load config
 with open("config.json", "r") as f:
@@ -26,66 +44,242 @@ with open("config.json", "r") as f:
 CAM_INDEX = CONFIG.get("camera_index", 0)
 COOLDOWN_MS = CONFIG.get("cooldown_ms", 00)
 MAX_HISTORY = CONFIG.get("history_length", 8)
+MOTION_THRESHOLD = CONFIG.get("motion_threshold", 2.0)
+MOTION_MAX_SKIP_NS = int(CONFIG.get("motion_max_skip_ms", 100) * 1_000_000)
+PREVIEW_SCALE = CONFIG.get("preview_scale", 1.0)
+SHOW_PREVIEW = CONFIG.get("show_preview", True)
+PREVIEW_FPS = CONFIG.get("preview_fps", 15)
+PREVIEW_INTERVAL_NS = int(1e9 / PREVIEW_FPS) if PREVIEW_FPS > 0 else 0  # <= 0: no throttle
+# The published hand_landmarker.task bundle is the float16, XNNPACK-friendly model
+MODEL_PATH = CONFIG.get("model_asset_path", "hand_landmarker.task")
+MODEL_URL = CONFIG.get(
+    "model_url",
+    "https://storage.googleapis.com/mediapipe-models/hand_landmarker/hand_landmarker/float16/latest/hand_landmarker.task",
+)
+GESTURE_CFG = GestureConfig.from_dict(CONFIG)
 
-mp_hands = mp.solutions.hands
-mp_drawing = mp.solutions.drawing_utils
+HAND_CONNECTIONS = [(c.start, c.end) for c in vision.HandLandmarksConnections.HAND_CONNECTIONS]
 
 cooldown = ActionCooldown(COOLDOWN_MS)
+debouncer = GestureDebouncer(
+    cooldown,
+    confirm_ms=CONFIG.get("confirm_ms", 100),
+    release_ms=CONFIG.get("release_ms", 150),
+)
 hand_history = HandHistory(MAX_HISTORY)
 
-cap = cv2.VideoCapture(CAM_INDEX)
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, CONFIG.get("frame_width", 1080))
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CONFIG.get("frame_height", 720))
+# The default backends (MSMF on Windows) queue several frames internally, which shows
+# up as input lag; DirectShow / V4L2 with MJPEG and a 1-frame buffer keep it minimal.
+if sys.platform.startswith("win"):
+    CAP_BACKEND = cv2.CAP_DSHOW
+elif sys.platform.startswith("linux"):
+    CAP_BACKEND = cv2.CAP_V4L2
+else:
+    CAP_BACKEND = cv2.CAP_ANY
 
-with mp_hands.Hands(
-    static_image_mode=False,
-    max_num_hands=1,
-    min_detection_confidence=CONFIG.get("min_detection_confidence", 0.6),
-    min_tracking_confidence=CONFIG.get("min_tracking_confidence", 0.6),
-) as hands:
+cap = cv2.VideoCapture(CAM_INDEX, CAP_BACKEND)
+if not cap.isOpened():  # some cameras only work through the default backend
+    cap = cv2.VideoCapture(CAM_INDEX)
+cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+cap.set(cv2.CAP_PROP_FPS, CONFIG.get("camera_fps", 30))
+# MediaPipe downsamples to 256x256 internally, so a larger capture only costs bandwidth
+cap.set(cv2.CAP_PROP_FRAME_WIDTH, CONFIG.get("frame_width", 640))
+cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CONFIG.get("frame_height", 480))
+
+running = threading.Event()
+latest_frame = LatestValue()      # newest raw (unmirrored) camera frame
+latest_annotated = LatestValue()  # newest frame with overlay, ready to show
+latest_result = LatestValue()     # newest HandLandmarkerResult from the async callback
+
+
+def on_result(result, output_image, timestamp_ms):
+    # Called on MediaPipe's own thread once a detect_async() frame is done
+    latest_result.put(result)
+
+
+def draw_hand(frame, lm):
+    h, w, _ = frame.shape
+    pts = [tuple(p) for p in (lm[:, :2] * (w, h)).astype(int).tolist()]
+    for a, b in HAND_CONNECTIONS:
+        cv2.line(frame, pts[a], pts[b], (224, 224, 224), 2)
+    for p in pts:
+        cv2.circle(frame, p, 3, (0, 0, 255), -1)
+
+
+def capture_loop():
+    # Grab frames as fast as the camera delivers them; only the newest one is kept.
     try:
-        while True:
+        while running.is_set():
             ret, frame = cap.read()
             if not ret:
                 print("Failed to read frame from camera.")
                 break
+            latest_frame.put(frame)
+    finally:
+        running.clear()
 
-            frame = cv2.flip(frame, 1)  # Mirror
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = hands.process(rgb)
-
-            gesture_name = "none"
-            if results.multi_hand_landmarks:
-                hand_landmarks = results.multi_hand_landmarks[0]
-                # Add center x to history for swipe detection
-                h, w, _ = frame.shape
-                cx = int(hand_landmarks.landmark[9].x * w)  # use landmark 9 (palm center)
-                hand_history.append(cx)
-
-                gesture_name = detect_gesture(hand_landmarks, hand_history, frame.shape, CONFIG)
-                # Quit immediately on pinch gesture
-                if gesture_name == "quit":
-                    print("Pinch detected — quitting")
-                    break
-                # Perform action if not in cooldown
-                if gesture_name != "none" and cooldown.is_ready():
-                    performed = perform_action(gesture_name)
-                    if performed:
-                        cooldown.trigger()
-            else:
-                hand_history.append(None)  # keep timeline
-
-            # Draw & overlay
-            if results.multi_hand_landmarks:
-                mp_drawing.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+
+def inference_loop(landmarker):
+    # Consume the newest frame, submit it to MediaPipe without waiting, then run the
+    # gesture logic on the newest result that has come back and publish the overlay.
+    prev_gray = None
+    rgb = None  # reused RGB buffer; mp.Image copies its input
+    inv_frame_w = 1.0
+    last_ts = -1
+    last_submit_ns = 0
+    last_preview_ns = 0
+    seq = 0
+    # Results already counted; starts past the warm-up result
+    result_seq, _ = latest_result.peek()
+    hand_landmarks = None
+    gesture_name = "none"
+    try:
+        while running.is_set():
+            seq, frame = latest_frame.get(seq, timeout=0.5)
+            if frame is None:
+                continue
+
+            # Skip inference when the scene hasn't changed: compare a small grayscale
+            # thumbnail against the last submitted frame and keep the last result.
+            # A pose change with the hand in place (fist -> thumbs up) moves too few
+            # pixels to beat the whole-frame mean, so the gate only applies while no
+            # hand is tracked, and never for longer than motion_max_skip_ms.
+            small = cv2.resize(frame, (160, 120))
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            now = time.monotonic_ns()
+            still = (
+                prev_gray is not None
+                and hand_landmarks is None
+                and now - last_submit_ns < MOTION_MAX_SKIP_NS
+                and cv2.absdiff(gray, prev_gray).mean() < MOTION_THRESHOLD
+            )
+            if not still:
+                if rgb is None or rgb.shape != frame.shape:
+                    rgb = np.empty_like(frame)
+                    inv_frame_w = 1.0 / max(1, frame.shape[1])
+                # Inference runs on the unmirrored frame so this is the only full-frame
+                # pass; the landmarks are mirrored afterwards instead of the pixels.
+                cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+                # Live-stream mode requires strictly increasing timestamps
+                ts = max(time.monotonic_ns() // 1_000_000, last_ts + 1)
+                landmarker.detect_async(mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb), ts)
+                last_ts = ts
+                last_submit_ns = now
+                prev_gray = gray
+
+            # Results arrive asynchronously and the same one is seen by several captured
+            # frames; add each to the history only once so the swipe/rotation window
+            # spans real inferences. The debouncer below still sees the last gesture
+            # every frame, because it times how long that gesture has been reported.
+            new_seq, result = latest_result.peek()
+            if new_seq != result_seq:
+                result_seq = new_seq
+                hand_landmarks = result.hand_landmarks[0] if result and result.hand_landmarks else None
+
+                gesture_name = "none"
+                if hand_landmarks:
+                    lm = landmarks_to_np(hand_landmarks)
+                    lm[:, 0] = 1.0 - lm[:, 0]  # Mirror
+                    # Add center x (pixels) and y (normalized) to history for swipe detection
+                    cx = int(lm[9, 0] * frame.shape[1])  # use landmark 9 (palm center)
+                    hand_history.append(cx, lm[9, 1])
+
+                    gesture_name = detect_gesture(lm, hand_history, inv_frame_w, GESTURE_CFG)
+                    # Quit immediately on pinch gesture
+                    if gesture_name == "quit":
+                        print("Pinch detected — quitting")
+                        break
+                else:
+                    hand_history.append(None)  # keep timeline
+
+            # Fire on a confirmed change of gesture, not on every frame it's held
+            to_fire = debouncer.update(gesture_name)
+            if to_fire and perform_action(to_fire):
+                debouncer.fired(to_fire)
+
+            # The preview is only a convenience: skip it entirely when hidden and
+            # throttle it to preview_fps otherwise.
+            now = time.monotonic_ns()
+            if not SHOW_PREVIEW or now - last_preview_ns < PREVIEW_INTERVAL_NS:
+                continue
+            last_preview_ns = now
+
+            # Draw & overlay on a mirrored copy for display
+            frame = cv2.flip(frame, 1)
+            if hand_landmarks:
+                draw_hand(frame, lm)
 
             cv2.putText(frame, f"Gesture: {gesture_name}", (10, 30),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.9, (30, 144, 255), 2)
+            latest_annotated.put(frame)
+    finally:
+        running.clear()
 
-            cv2.imshow("Gesture Media Controller", frame)
-            key = cv2.waitKey(1) & 0xFF
-            if key == 27 or key == ord('q'):  # ESC or q to quit
-                break
+
+options = vision.HandLandmarkerOptions(
+    base_options=mp_python.BaseOptions(
+        model_asset_path=ensure_model(MODEL_PATH, MODEL_URL),
+        delegate=mp_python.BaseOptions.Delegate.CPU,  # XNNPACK
+    ),
+    running_mode=vision.RunningMode.LIVE_STREAM,
+    num_hands=1,
+    min_hand_detection_confidence=CONFIG.get("min_detection_confidence", 0.6),
+    min_tracking_confidence=CONFIG.get("min_tracking_confidence", 0.6),
+    result_callback=on_result,
+)
+
+with vision.HandLandmarker.create_from_options(options) as landmarker:
+    # Run one blank frame through the graph (and touch the key backends) before the
+    # camera starts, so the first real gesture doesn't pay for lazy initialisation.
+    warm_up()
+    blank = np.zeros((CONFIG.get("frame_height", 480), CONFIG.get("frame_width", 640), 3), np.uint8)
+    landmarker.detect_async(mp.Image(image_format=mp.ImageFormat.SRGB, data=blank), 0)
+    if latest_result.get(0, timeout=5.0)[1] is None:
+        print("MediaPipe warm-up didn't finish within 5 s; the first frames may be slow")
+    # Same for the Numba gesture classifier: compile it (or load it from the cache)
+    # here instead of on the first frame that has a hand in it.
+    detect_gesture(np.zeros((21, 3), np.float32), HandHistory(MAX_HISTORY), 1.0, GESTURE_CFG)
+
+    running.set()
+    workers = [
+        threading.Thread(target=capture_loop, name="capture", daemon=True),
+        threading.Thread(target=inference_loop, args=(landmarker,), name="inference", daemon=True),
+    ]
+    for t in workers:
+        t.start()
+
+    try:
+        if SHOW_PREVIEW:
+            shown = 0
+            while running.is_set():
+                shown, frame = latest_annotated.get(shown, timeout=0.05)
+                if frame is not None:
+                    if PREVIEW_SCALE != 1.0:  # upscale for display only
+                        frame = cv2.resize(frame, None, fx=PREVIEW_SCALE, fy=PREVIEW_SCALE,
+                                           interpolation=cv2.INTER_LINEAR)
+                    cv2.imshow("Gesture Media Controller", frame)
+                key = cv2.waitKey(1) & 0xFF
+                if key == 27 or key == ord('q'):  # ESC or q to quit
+                    break
+        else:
+            print("Running without preview — press Esc (or Ctrl+C) to quit")
+            poll_esc = keyboard is not None
+            while running.is_set():
+                if poll_esc:
+                    try:
+                        if keyboard.is_pressed("esc"):
+                            break
+                    except Exception as e:
+                        # e.g. keyboard needs root on Linux; stop polling, Ctrl+C still works
+                        print(f"Can't watch for Esc ({e}) — press Ctrl+C to quit")
+                        poll_esc = False
+                time.sleep(0.05)
+    except KeyboardInterrupt:
+        pass
     finally:
+        running.clear()
+        for t in workers:
+            t.join(timeout=1.0)
         cap.release()
         cv2.destroyAllWindows()
@@ -1,32 +1,160 @@
 """
-Utility classes: cooldown timer, hand history buffer.
+Utility classes: cooldown timer, hand history buffer, latest-value slot.
+Plus a helper to fetch the hand landmark model on first run.
 """
 
+import os
+import threading
 import time
-from collections import deque
+import urllib.request
+
+import numpy as np
 
 class ActionCooldown:
+    # Uses the monotonic clock so wall-clock adjustments (NTP, DST) can't stall or skip it
     def __init__(self, cooldown_ms: int = 1000):
         self.cooldown_ms = cooldown_ms
-        self._last = 0
+        self._cooldown_ns = int(cooldown_ms * 1_000_000)
+        self._last = -self._cooldown_ns  # ready immediately
 
     def is_ready(self):
-        return (time.time() * 1000) - self._last >= self.cooldown_ms
+        return time.monotonic_ns() - self._last >= self._cooldown_ns
 
     def trigger(self):
-        self._last = time.time() * 1000
+        self._last = time.monotonic_ns()
+
+class GestureDebouncer:
+    """
+    Turns the per-frame gesture stream into one-shot triggers.
+    A gesture fires once it has been reported continuously for confirm_ms,
+    differs from the last gesture fired, and the cooldown is ready. Holding a
+    pose doesn't re-fire; release_ms of "none" re-arm the last gesture.
+    Timing is in ms rather than counted updates, so it works the same whether
+    results arrive every frame or the motion gate holds the last one.
+    """
+    def __init__(self, cooldown: ActionCooldown, confirm_ms=100, release_ms=150):
+        self.cooldown = cooldown
+        self._confirm_ns = int(confirm_ms * 1_000_000)
+        self._release_ns = int(release_ms * 1_000_000)
+        self.last_fired = None
+        self._candidate = "none"
+        self._since = time.monotonic_ns()
+
+    def update(self, gesture: str, now_ns=None):
+        # Feed the gesture currently reported; returns the gesture to fire now, or None
+        now = time.monotonic_ns() if now_ns is None else now_ns
+        if gesture != self._candidate:
+            self._candidate = gesture
+            self._since = now
+        held = now - self._since
+
+        if gesture == "none":
+            if held >= self._release_ns:
+                self.last_fired = None
+            return None
+
+        if (held >= self._confirm_ns and gesture != self.last_fired
+                and self.cooldown.is_ready()):
+            return gesture
+        return None
+
+    def fired(self, gesture: str):
+        # Call after the action for `gesture` was actually sent
+        self.last_fired = gesture
+        self.cooldown.trigger()
+
+
+class RingBuffer:
+    """
+    Fixed-size float ring buffer backed by a preallocated NumPy array.
+    Missing samples are stored as NaN. Every value is written twice, maxlen
+    apart, so the chronological window is always a contiguous view; the
+    gesture classifier scans that view directly and skips the NaNs.
+    """
+    def __init__(self, maxlen=8):
+        self.maxlen = maxlen
+        self._buf = np.full(2 * maxlen, np.nan, dtype=np.float32)
+        self._idx = 0      # next slot to write
+        self.count = 0     # samples written, capped at maxlen
+
+    def append(self, x):
+        v = np.nan if x is None else x
+        self._buf[self._idx] = v
+        self._buf[self._idx + self.maxlen] = v
+        self._idx = (self._idx + 1) % self.maxlen
+        if self.count < self.maxlen:
+            self.count += 1
+
+    def window(self) -> np.ndarray:
+        # Oldest -> newest view of the stored samples (no copy)
+        end = self._idx + self.maxlen
+        return self._buf[end - self.count:end]
+
+    def clear(self):
+        self._buf.fill(np.nan)
+        self._idx = 0
+        self.count = 0
+
 
 class HandHistory:
     """
-    Keeps a short history of palm-center x coordinates to detect swipe direction.
+    Keeps a short history of palm-center x/y coordinates to detect swipe direction
+    and vertical palm movement.
     Append None when no hand seen to keep timeline consistent.
+    Hand angles (for rotation) are appended by detect_gesture while a hand is seen.
     """
     def __init__(self, maxlen=8):
-        self.history = deque(maxlen=maxlen)
+        self.maxlen = maxlen
+        self.xs = RingBuffer(maxlen)
+        self.ys = RingBuffer(maxlen)
+        self.angles = RingBuffer(maxlen)
 
-    def append(self, x):
-        # x is normalized or pixel coordinate (we use pixel in main)
-        self.history.append(x)
+    def append(self, x, y=None):
+        # x is normalized or pixel coordinate (we use pixel in main); y is normalized
+        self.xs.append(x)
+        self.ys.append(y)
 
     def clear(self):
-        self.history.clear()
+        self.xs.clear()
+        self.ys.clear()
+        self.angles.clear()
+
+
+class LatestValue:
+    """
+    Thread-safe single-slot buffer that only keeps the newest value.
+    Writers overwrite whatever is there; readers wait for something newer
+    than the sequence number they last saw, so stale values are dropped.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._value = None
+        self._seq = 0
+
+    def put(self, value):
+        with self._cond:
+            self._value = value
+            self._seq += 1
+            self._cond.notify_all()
+
+    def get(self, after_seq=0, timeout=None):
+        # Returns (seq, value); value is None if nothing newer arrived before timeout
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after_seq, timeout):
+                return after_seq, None
+            return self._seq, self._value
+
+    def peek(self):
+        # Returns (seq, value) immediately, without waiting for anything new
+        with self._cond:
+            return self._seq, self._value
+
+
+def ensure_model(path, url):
+    # Download the model bundle once if it isn't on disk yet; returns the path
+    if not os.path.exists(path):
+        print(f"Downloading hand landmark model to {path} ...")
+        tmp = path + ".part"
+        urllib.request.urlretrieve(url, tmp)
+        os.replace(tmp, path)
+    return path